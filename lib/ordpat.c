@@ -51,6 +51,16 @@
 #include <stdlib.h>
 #include <string.h>
 
+/**
+ * SIMD implementations are provided for x86 processors, and selected at run
+ * time depending on the instruction set extensions supported by the CPU.
+ * This requires a compiler that understands GCC's target attributes.
+ */
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__))
+    #define ORDPAT_X86_SIMD
+    #include <immintrin.h>
+#endif
+
 /**
  * function: sequence_length
  *
@@ -142,6 +152,223 @@ static uint64_t encode_pattern(const double *in,
 }
 
 
+/**
+ * function: encode_plain_scalar
+ *
+ * Extract and encode the first @len ordinal patterns of order @ord from the
+ * time series pointed to by @in, using the time lag @lag, and store them in
+ * the array pointed to by @out.
+ *
+ * This is the portable implementation of the 'plain' algorithm, which the
+ * SIMD implementations below are substituted for where supported.
+ */
+
+static void encode_plain_scalar(const double *in,
+                                uint64_t     *out,
+                                size_t        len,
+                                unsigned int  ord,
+                                unsigned int  lag)
+{
+    /* Plain and simple, hence the name... */
+    while (len--)
+        *out++ = encode_pattern(in++, ord, lag);
+}
+
+
+#ifdef ORDPAT_X86_SIMD
+
+/**
+ * function: encode_plain_sse2
+ *
+ * Same as @encode_plain_avx2, but processes two consecutive patterns at a
+ * time using SSE2 instructions. THE CPU MUST SUPPORT SSE2, and no error
+ * checks are performed.
+ */
+
+__attribute__((target("sse2")))
+static void encode_plain_sse2(const double *in,
+                              uint64_t     *out,
+                              size_t        len,
+                              unsigned int  ord,
+                              unsigned int  lag)
+{
+    for (; len >= 2; len -= 2) {
+        uint64_t     code[2] = {0};
+        uint64_t     count[2];
+        unsigned int i, j, k;
+
+        for (i = 0; i < ord - 1; ++i) {
+            /* i-th tuple elements of two consecutive patterns */
+            __m128d lhs = _mm_loadu_pd(in + i * lag);
+            __m128i cnt = _mm_setzero_si128();
+
+            for (j = i + 1; j < ord; ++j) {
+                __m128d rhs = _mm_loadu_pd(in + j * lag);
+                __m128d cmp = _mm_cmpgt_pd(lhs, rhs);
+
+                /* Each lane of @cmp is either all zeros or all ones (-1). */
+                cnt = _mm_sub_epi64(cnt, _mm_castpd_si128(cmp));
+            }
+
+            _mm_storeu_si128((__m128i *)count, cnt);
+
+            for (k = 0; k < 2; ++k)
+                code[k] = (code[k] + count[k]) * (ord - 1 - i);
+        }
+
+        for (k = 0; k < 2; ++k)
+            *out++ = code[k];
+
+        in += 2;
+    }
+
+    /* Encode the remaining patterns one at a time. */
+    while (len--)
+        *out++ = encode_pattern(in++, ord, lag);
+}
+
+
+/**
+ * function: encode_plain_avx2
+ *
+ * Extract and encode the first @len ordinal patterns of order @ord from the
+ * time series pointed to by @in, using the time lag @lag, and store them in
+ * the array pointed to by @out.
+ *
+ * The function produces the same result as calling @encode_pattern @len
+ * times, but processes four consecutive patterns at a time using AVX2
+ * instructions. THE CPU MUST SUPPORT AVX2, and no error checks are performed.
+ */
+
+__attribute__((target("avx2")))
+static void encode_plain_avx2(const double *in,
+                              uint64_t     *out,
+                              size_t        len,
+                              unsigned int  ord,
+                              unsigned int  lag)
+{
+    for (; len >= 4; len -= 4) {
+        uint64_t     code[4] = {0};
+        uint64_t     count[4];
+        unsigned int i, j, k;
+
+        for (i = 0; i < ord - 1; ++i) {
+            /* i-th tuple elements of four consecutive patterns */
+            __m256d lhs = _mm256_loadu_pd(in + i * lag);
+            __m256i cnt = _mm256_setzero_si256();
+
+            for (j = i + 1; j < ord; ++j) {
+                __m256d rhs = _mm256_loadu_pd(in + j * lag);
+                __m256d cmp = _mm256_cmp_pd(lhs, rhs, _CMP_GT_OQ);
+
+                /* Each lane of @cmp is either all zeros or all ones (-1). */
+                cnt = _mm256_sub_epi64(cnt, _mm256_castpd_si256(cmp));
+            }
+
+            _mm256_storeu_si256((__m256i *)count, cnt);
+
+            for (k = 0; k < 4; ++k)
+                code[k] = (code[k] + count[k]) * (ord - 1 - i);
+        }
+
+        for (k = 0; k < 4; ++k)
+            *out++ = code[k];
+
+        in += 4;
+    }
+
+    /* Encode the remaining patterns one at a time. */
+    while (len--)
+        *out++ = encode_pattern(in++, ord, lag);
+}
+
+
+/**
+ * function: encode_plain_avx512
+ *
+ * Same as @encode_plain_avx2, but processes eight consecutive patterns at a
+ * time using AVX-512 instructions. Comparisons yield bit masks, and the
+ * pattern codes are updated in vector registers. THE CPU MUST SUPPORT
+ * AVX-512F AND AVX-512DQ, and no error checks are performed.
+ */
+
+__attribute__((target("avx512f,avx512dq")))
+static void encode_plain_avx512(const double *in,
+                                uint64_t     *out,
+                                size_t        len,
+                                unsigned int  ord,
+                                unsigned int  lag)
+{
+    const __m512i one = _mm512_set1_epi64(1);
+
+    for (; len >= 8; len -= 8) {
+        __m512i      code = _mm512_setzero_si512();
+        unsigned int i, j;
+
+        for (i = 0; i < ord - 1; ++i) {
+            /* i-th tuple elements of eight consecutive patterns */
+            __m512d lhs = _mm512_loadu_pd(in + i * lag);
+
+            for (j = i + 1; j < ord; ++j) {
+                __m512d   rhs = _mm512_loadu_pd(in + j * lag);
+                __mmask8  cmp = _mm512_cmp_pd_mask(lhs, rhs, _CMP_GT_OQ);
+
+                code = _mm512_mask_add_epi64(code, cmp, code, one);
+            }
+
+            code = _mm512_mullo_epi64(code, _mm512_set1_epi64(ord - 1 - i));
+        }
+
+        _mm512_storeu_si512((void *)out, code);
+
+        in += 8;
+        out += 8;
+    }
+
+    /* Encode the remaining patterns one at a time. */
+    while (len--)
+        *out++ = encode_pattern(in++, ord, lag);
+}
+
+#endif /* ORDPAT_X86_SIMD */
+
+
+/**
+ * The implementation of the 'plain' algorithm used by @ordpat_encode_plain.
+ * On x86 processors, it is replaced by the best SIMD implementation that
+ * the CPU supports when the library is loaded.
+ */
+
+static void (*encode_plain)(const double *, uint64_t *, size_t,
+                            unsigned int, unsigned int) = encode_plain_scalar;
+
+
+#ifdef ORDPAT_X86_SIMD
+
+/**
+ * function: select_simd_implementations
+ *
+ * Select the SIMD implementations to be used, depending on the instruction
+ * set extensions supported by the CPU. The function runs once, when the
+ * library is loaded, such that no checks are necessary in later calls.
+ */
+
+__attribute__((constructor))
+static void select_simd_implementations(void)
+{
+    __builtin_cpu_init();
+
+    if (__builtin_cpu_supports("avx512f") &&
+        __builtin_cpu_supports("avx512dq"))
+        encode_plain = encode_plain_avx512;
+    else if (__builtin_cpu_supports("avx2"))
+        encode_plain = encode_plain_avx2;
+    else if (__builtin_cpu_supports("sse2"))
+        encode_plain = encode_plain_sse2;
+}
+#endif
+
+
 /**
  * function: add_mp
  *
@@ -411,12 +638,21 @@ ORDPAT_API size_t ordpat_pattern_width(unsigned int ord)
 }
 
 
-ORDPAT_API int ordpat_create_lookup_table(uint64_t     *table,
-                                          size_t        len,
-                                          unsigned int  ord)
+/**
+ * function: create_lookup_table
+ *
+ * Create a lookup table of pattern codes that are @width bytes wide each.
+ * The public functions below call this function with a constant @width, so
+ * as to let the compiler generate a specialised version for each width.
+ */
+
+static inline int create_lookup_table(void         *table,
+                                      size_t        width,
+                                      size_t        len,
+                                      unsigned int  ord)
 {
     double    tuple[10] = {2, 4, 6, 8, 10, 12, 14, 16, 18, 20};
-    uint64_t *ptr       = table;
+    char     *ptr       = table;
     size_t    fact;
     size_t    num_tails;
 
@@ -434,22 +670,60 @@ ORDPAT_API int ordpat_create_lookup_table(uint64_t     *table,
         size_t num_ranks = ord;
 
         while (num_ranks--) {
+            uint64_t code;
+
             tuple[ord - 1] = 2 * num_ranks + 1;
-            *ptr++ = encode_pattern(tuple, ord, 1);
+            code = encode_pattern(tuple, ord, 1);
+
+            switch (width) {
+                case 2:  *(uint16_t *)ptr = (uint16_t)code; break;
+                case 4:  *(uint32_t *)ptr = (uint32_t)code; break;
+                default: *(uint64_t *)ptr = code;
+            }
+
+            ptr += width;
         }
 
         next_perm(tuple, ord - 1);
     }
 
     while (--ord) {
-        memcpy(ptr, table, fact * sizeof(uint64_t));
-        ptr += fact;
+        memcpy(ptr, table, fact * width);
+        ptr += fact * width;
     }
 
     return ORDPAT_SUCCESS;
 }
 
 
+ORDPAT_API int ordpat_create_lookup_table(uint64_t     *table,
+                                          size_t        len,
+                                          unsigned int  ord)
+{
+    return create_lookup_table(table, sizeof(uint64_t), len, ord);
+}
+
+
+ORDPAT_API int ordpat_create_lookup_table_u32(uint32_t     *table,
+                                              size_t        len,
+                                              unsigned int  ord)
+{
+    return create_lookup_table(table, sizeof(uint32_t), len, ord);
+}
+
+
+ORDPAT_API int ordpat_create_lookup_table_u16(uint16_t     *table,
+                                              size_t        len,
+                                              unsigned int  ord)
+{
+    /* Orders > 8 have pattern codes that do not fit into 16 bits. */
+    if (ord > 8)
+        return ORDPAT_ERROR_ORDER_INVALID;
+
+    return create_lookup_table(table, sizeof(uint16_t), len, ord);
+}
+
+
 ORDPAT_API int ordpat_encode_plain(const double *in,
                                    size_t        n_in,
                                    uint64_t     *out,
@@ -465,9 +739,7 @@ ORDPAT_API int ordpat_encode_plain(const double *in,
     if (ret != ORDPAT_SUCCESS)
         return ret;
 
-    /* Plain and simple, hence the name... */
-    while (len--)
-        *out++ = encode_pattern(in++, ord, lag);
+    encode_plain(in, out, len, ord, lag);
 
     return ORDPAT_SUCCESS;
 }
@@ -569,6 +841,28 @@ ORDPAT_API int ordpat_encode_overlap(const double *in,
 }
 
 
+ORDPAT_API int ordpat_encode_overlap_batch(const double *in,
+                                           size_t        n_series,
+                                           size_t        n_in,
+                                           uint64_t     *out,
+                                           size_t        n_out,
+                                           unsigned int  ord,
+                                           unsigned int  lag)
+{
+    while (n_series--) {
+        int ret = ordpat_encode_overlap(in, n_in, out, n_out, ord, lag);
+
+        if (ret != ORDPAT_SUCCESS)
+            return ret;
+
+        in += n_in;
+        out += n_out;
+    }
+
+    return ORDPAT_SUCCESS;
+}
+
+
 ORDPAT_API int ordpat_encode_overlap_mp(const double *in,
                                         size_t        n_in,
                                         uint64_t     *out,
@@ -671,13 +965,22 @@ ORDPAT_API int ordpat_encode_overlap_mp(const double *in,
 }
 
 
-ORDPAT_API int ordpat_encode_lookup(const double *in,
-                                    size_t        n_in,
-                                    uint64_t     *out,
-                                    size_t        n_out,
-                                    unsigned int  ord,
-                                    unsigned int  lag,
-                                    uint64_t     *tab)
+/**
+ * function: encode_lookup
+ *
+ * Implement the 'lookup' algorithm for a lookup table @tab of pattern codes
+ * that are @width bytes wide each. As with @create_lookup_table, @width is
+ * a constant in each of the calls below.
+ */
+
+static inline int encode_lookup(const double *in,
+                                size_t        n_in,
+                                uint64_t     *out,
+                                size_t        n_out,
+                                unsigned int  ord,
+                                unsigned int  lag,
+                                const void   *tab,
+                                size_t        width)
 {
     size_t len;
     size_t pos;
@@ -702,6 +1005,7 @@ ORDPAT_API int ordpat_encode_lookup(const double *in,
     for (pos = lag; pos < len; ++pos) {
         unsigned int count = 0;
         unsigned int i;
+        size_t       idx;
 
         /* Get the rightmost inversion count. */
         for (i = 0; i < ord - 1; ++i)
@@ -711,7 +1015,13 @@ ORDPAT_API int ordpat_encode_lookup(const double *in,
          * Look up the result, which depends on the inversion count, as well
          * as the ordinal pattern @lag time steps earlier.
          */
-        *out = tab[*(out - lag) * ord + count];
+        idx = *(out - lag) * ord + count;
+
+        switch (width) {
+            case 2:  *out = ((const uint16_t *)tab)[idx]; break;
+            case 4:  *out = ((const uint32_t *)tab)[idx]; break;
+            default: *out = ((const uint64_t *)tab)[idx];
+        }
 
         /* Step ahead. */
         ++in;
@@ -722,6 +1032,48 @@ ORDPAT_API int ordpat_encode_lookup(const double *in,
 }
 
 
+ORDPAT_API int ordpat_encode_lookup(const double *in,
+                                    size_t        n_in,
+                                    uint64_t     *out,
+                                    size_t        n_out,
+                                    unsigned int  ord,
+                                    unsigned int  lag,
+                                    uint64_t     *tab)
+{
+    return encode_lookup(in, n_in, out, n_out, ord, lag, tab,
+                         sizeof(uint64_t));
+}
+
+
+ORDPAT_API int ordpat_encode_lookup_u32(const double   *in,
+                                        size_t          n_in,
+                                        uint64_t       *out,
+                                        size_t          n_out,
+                                        unsigned int    ord,
+                                        unsigned int    lag,
+                                        const uint32_t *tab)
+{
+    return encode_lookup(in, n_in, out, n_out, ord, lag, tab,
+                         sizeof(uint32_t));
+}
+
+
+ORDPAT_API int ordpat_encode_lookup_u16(const double   *in,
+                                        size_t          n_in,
+                                        uint64_t       *out,
+                                        size_t          n_out,
+                                        unsigned int    ord,
+                                        unsigned int    lag,
+                                        const uint16_t *tab)
+{
+    if (ord > 8)
+        return ORDPAT_ERROR_ORDER_INVALID;
+
+    return encode_lookup(in, n_in, out, n_out, ord, lag, tab,
+                         sizeof(uint16_t));
+}
+
+
 ORDPAT_API void ordpat_xorshift_rand_uint32(uint32_t *dst,
                                             size_t    len,
                                             uint32_t  seed)
@@ -148,6 +148,28 @@ ORDPAT_API int ordpat_create_lookup_table(uint64_t     *table,
                                           unsigned int  ord);
 
 
+/**
+ * function: ordpat_create_lookup_table_u32
+ * function: ordpat_create_lookup_table_u16
+ *
+ * Same as @ordpat_create_lookup_table, but store the pattern codes as 32-bit
+ * or 16-bit integers, respectively. The 16-bit variant supports orders
+ * 1 < @ord < 9 only.
+ *
+ * A smaller table takes up less cache, which speeds up the 'lookup'
+ * algorithm considerably for larger orders. The tables are to be used with
+ * @ordpat_encode_lookup_u32 and @ordpat_encode_lookup_u16.
+ */
+
+ORDPAT_API int ordpat_create_lookup_table_u32(uint32_t     *table,
+                                              size_t        len,
+                                              unsigned int  ord);
+
+ORDPAT_API int ordpat_create_lookup_table_u16(uint16_t     *table,
+                                              size_t        len,
+                                              unsigned int  ord);
+
+
 /**
  * function: ordpat_encode_plain
  *
@@ -167,6 +189,11 @@ ORDPAT_API int ordpat_create_lookup_table(uint64_t     *table,
  * in @out has to be provided in @n_out, and must be at least @n_out =
  * @n_in - (@ord - 1) * @lag.
  *
+ * On x86 processors, the comparisons of two (SSE2), four (AVX2) or eight
+ * (AVX-512) consecutive patterns are evaluated at a time. The instruction
+ * set is detected once when the library is loaded, and the result does not
+ * depend on it.
+ *
  * The function returns 0 on success, or one of the positive error codes
  * defined by @ordpat_error.
  */
@@ -210,6 +237,31 @@ ORDPAT_API int ordpat_encode_overlap(const double *in,
                                      unsigned int  lag);
 
 
+/**
+ * function: ordpat_encode_overlap_batch
+ *
+ * Transform @n_series double-valued time series into sequences of ordinal
+ * patterns using the 'overlap' algorithm, in a single call.
+ *
+ * The time series of length @n_in each are stored consecutively in @in,
+ * i.e., as the rows of a @n_series x @n_in array in row-major order.
+ * Likewise, the sequence of patterns for each time series is stored in a
+ * row of the @n_series x @n_out array @out. Otherwise, the function behaves
+ * like calling @ordpat_encode_overlap for each time series in turn.
+ *
+ * The function returns 0 on success, or one of the positive error codes
+ * defined by @ordpat_error.
+ */
+
+ORDPAT_API int ordpat_encode_overlap_batch(const double *in,
+                                           size_t        n_series,
+                                           size_t        n_in,
+                                           uint64_t     *out,
+                                           size_t        n_out,
+                                           unsigned int  ord,
+                                           unsigned int  lag);
+
+
 /**
  * function: ordpat_encode_overlap_mp
  *
@@ -289,6 +341,34 @@ ORDPAT_API int ordpat_encode_lookup(const double *in,
                                     uint64_t     *tab);
 
 
+/**
+ * function: ordpat_encode_lookup_u32
+ * function: ordpat_encode_lookup_u16
+ *
+ * Same as @ordpat_encode_lookup, but using a lookup table @tab created by
+ * @ordpat_create_lookup_table_u32 or @ordpat_create_lookup_table_u16,
+ * respectively. The 16-bit variant supports orders 1 < @ord < 9 only.
+ *
+ * The resulting pattern codes in @out are 64-bit wide in either case.
+ */
+
+ORDPAT_API int ordpat_encode_lookup_u32(const double   *in,
+                                        size_t          n_in,
+                                        uint64_t       *out,
+                                        size_t          n_out,
+                                        unsigned int    ord,
+                                        unsigned int    lag,
+                                        const uint32_t *tab);
+
+ORDPAT_API int ordpat_encode_lookup_u16(const double   *in,
+                                        size_t          n_in,
+                                        uint64_t       *out,
+                                        size_t          n_out,
+                                        unsigned int    ord,
+                                        unsigned int    lag,
+                                        const uint16_t *tab);
+
+
 /**
  * function: ordpat_xorshift_rand_uint32
  *
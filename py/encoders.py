@@ -40,12 +40,14 @@ This module provides Python implementations of the
   * 'overlap'
   * 'lookup'
   * 'vectorised'
+  * 'argsort'
 
 algorithms, which all allow for encoding ordinal patterns of order m
 into non-negative integers between 0 and factorial(ord) - 1.
 
 The 'vectorised' algorithm is probably the only one that makes practical
-sense for a Python implementation.
+sense for a Python implementation, unless Numba is installed. In that case,
+the inner loops of the other algorithms are compiled to machine code.
 
 """
 import numpy as _np
@@ -53,7 +55,23 @@ from math import factorial as _factorial
 
 import utils as _utils
 
+# Try to import Numba. If this fails, the decorated kernels below are simply
+# executed by the Python interpreter, which is slow but yields the same result.
+try:
+    from numba import njit as _njit, prange as _prange
+    _numba_loaded = True
+except ImportError:
+    def _njit(*args, **kwargs):
+        return lambda fcn: fcn
 
+    _prange = range
+    _numba_loaded = False
+
+# Number of patterns per block processed by a thread of the 'lookup' kernel.
+_LOOKUP_BLOCK = 2**16
+
+
+@_njit(cache=True)
 def _encode_pattern(x):
     ord = len(x)      # pattern order
     n_rel = ord - 1   # number of order relations
@@ -69,6 +87,131 @@ def _encode_pattern(x):
     return y
 
 
+@_njit(cache=True, parallel=True, boundscheck=False)
+def _plain_kernel(x, ord, lag, pat):
+    n_rel = ord - 1   # number of order relations
+
+    for k in _prange(pat.size):
+        y = 0
+
+        for i in range(0, n_rel):
+            for j in range(i + 1, ord):
+                y += x[k + i*lag] > x[k + j*lag]
+
+            y *= n_rel - i
+
+        pat[k] = y
+
+
+@_njit(cache=True, boundscheck=False)
+def _overlap_kernel(x, ord, lag, pat):
+    n_rel = ord - 1   # number of order relations
+
+    ranks = _np.zeros((lag, n_rel), dtype=_np.uint8)
+
+    for k in range(0, lag):
+        for i in range(0, n_rel - 1):
+            for j in range(i + 1, n_rel):
+                ranks[k, i + 1] += x[k + i*lag] > x[k + j*lag]
+
+    i = 0
+
+    for k in range(0, pat.size):
+        nxt = x[k + n_rel*lag]
+        y = 0
+
+        for j in range(0, n_rel):
+            # Shift inversion counts, and update with the new tuple element.
+            # (For these short rows, shifting in place is faster than
+            #  indexing into a circular buffer.)
+            if j < n_rel - 1:
+                ranks[i, j] = ranks[i, j + 1] + (x[k + j*lag] > nxt)
+            else:
+                ranks[i, j] = x[k + j*lag] > nxt
+
+            y += int(ranks[i, j])
+            y *= n_rel - j
+
+        pat[k] = y
+        i = (i + 1) % lag
+
+
+@_njit(cache=True, parallel=True, boundscheck=False)
+def _lookup_kernel(x, ord, lag, ranks, tab, pat):
+    # Each pattern depends on the one @lag time steps earlier. To allow for
+    # parallel processing, the output is split into blocks, and the first
+    # @lag patterns of each block are encoded directly.
+    n_blk = (pat.size + _LOOKUP_BLOCK - 1) // _LOOKUP_BLOCK
+
+    for b in _prange(n_blk):
+        beg = b * _LOOKUP_BLOCK
+        end = min(beg + _LOOKUP_BLOCK, pat.size)
+
+        for i in range(beg, min(beg + lag, end)):
+            pat[i] = _encode_pattern(x[i:i + ord*lag:lag])
+
+        for i in range(beg + lag, end):
+            pat[i] = tab[pat[i - lag], ranks[i]]
+
+
+def _plain_numpy(x, ord, lag, pat):
+    # Encode the time series along the last axis of `x` into `pat`. This
+    # serves as the 'plain' kernel without Numba, and as the 'vectorised'
+    # algorithm.
+    n_rel = ord - 1         # number of order relations
+    n_pat = pat.shape[-1]   # sequence length
+
+    # the i-th elements of all embedding vectors (views, not copies)
+    emb = [x[..., i*lag:i*lag + n_pat] for i in range(0, ord)]
+
+    # Horner's scheme is applied in the smallest word type that holds all
+    # pattern codes, as none of the intermediate values exceeds the final
+    # code. The result is copied into `pat` once at the end.
+    dtype = "uint{}".format(_utils.pattern_word_size(ord))
+    acc = _np.zeros(pat.shape, dtype=dtype)
+
+    # inversion count of the current position, and comparison result
+    # (all comparisons share the same temporary buffers)
+    cnt = _np.empty(pat.shape, dtype=_np.uint8)
+    cmp = _np.empty(pat.shape, dtype=_np.bool_)
+
+    for i in range(0, n_rel):
+        cnt[...] = 0
+
+        for j in range(i + 1, ord):
+            _np.greater(emb[i], emb[j], out=cmp)
+            cnt += cmp
+
+        acc += cnt
+        acc *= n_rel - i
+
+    pat[...] = acc
+
+
+def _argsort_numpy(emb, pat, valid=None):
+    ord = emb.shape[-1]   # pattern order
+    n_rel = ord - 1       # number of order relations
+
+    # Rank the elements of each embedding vector. A stable sort ranks equal
+    # values by their position, such that ties are resolved as in 'plain'.
+    perm = _np.argsort(emb, axis=-1, kind="stable")
+    ranks = _np.empty_like(perm)
+    _np.put_along_axis(ranks, perm, _np.arange(ord), axis=-1)
+
+    pat[...] = 0
+
+    for i in range(0, n_rel):
+        inv = ranks[..., i + 1:] < ranks[..., i:i + 1]
+
+        # Pairs involving NaN are no inversions (see encode_argsort).
+        if valid is not None:
+            inv &= valid[..., i:i + 1]
+            inv &= valid[..., i + 1:]
+
+        pat += inv.sum(axis=-1, dtype=_np.uint64)
+        pat *= n_rel - i
+
+
 def create_lookup_table(ord):
     """
     Return pattern table to be used with the 'lookup' algorithm.
@@ -85,9 +228,10 @@ def create_lookup_table(ord):
 
     Returns
     -------
-    table : ndarray of uint64
+    table : ndarray of uint16 or uint32
         A lookup table containing factorial(ord) * ord pattern codes.
-        Each code is a value between 0 and factorial(ord) - 1.
+        Each code is a value between 0 and factorial(ord) - 1, stored in
+        the smallest data type sufficient (uint16 for `ord` <= 8).
 
     """
     if not _utils.is_scalar_int(ord):
@@ -106,13 +250,14 @@ def create_lookup_table(ord):
     pat = _np.concatenate((pat, val), axis=1)
 
     tab = encode_vectorised(pat, ord, 1, trustme=True)
+    tab = tab.astype(_utils.lookup_table_dtype(ord))
     tab = tab.reshape((-1, ord))
     tab = _np.tile(tab, (ord, 1))
 
     return tab
 
 
-def encode_plain(x, ord, lag, trustme=False):
+def encode_plain(x, ord, lag, trustme=False, out=None):
     """
     Extract and encode ordinal patterns using the 'plain' algorithm.
 
@@ -120,8 +265,9 @@ def encode_plain(x, ord, lag, trustme=False):
     ----------
     x : array_like
         Time series data to be encoded. Can be multi-dimensional, and must be
-        convertible to an ndarray of data type 'double'. The input array is
-        flattened prior to encoding.
+        convertible to an ndarray of data type 'double'. Arrays of data type
+        'float32' are used without conversion. The input array is flattened
+        prior to encoding.
 
     ord : int
         Order of the encoding, an integer between 2 and 20.
@@ -132,7 +278,13 @@ def encode_plain(x, ord, lag, trustme=False):
 
     trustme : bool, optional
         If set to True, the function arguments are not validated before
-        processing. This will speed up the calculation.
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double' or 'float32'.
+
+    out : ndarray of uint64, optional
+        Array in which the result is stored. It must be C-contiguous, and
+        have the same shape as the returned array. By default, a new array
+        is allocated.
 
     Returns
     -------
@@ -142,26 +294,24 @@ def encode_plain(x, ord, lag, trustme=False):
 
     """
     if not trustme:
-        x = _utils.prepare_input_data(x, ord, lag)
+        x = _utils.prepare_input_data(x, ord, lag, allow_float32=True)
         if ord > 20:
             raise ValueError("plain algorithm does not support ord > 20")
 
     n_rel = ord - 1                # number of order relations
     n_pat = x.size - n_rel * lag   # sequence length
 
-    pat = _np.zeros(n_pat, dtype=_np.uint64)
+    pat = _utils.output_array(out, (n_pat,), trustme)
 
-    for k in range (0, n_pat):
-        for i in range(0, n_rel):
-            for j in range(i + 1, ord):
-                pat[k] += x[k + i*lag] > x[k + j*lag]
-
-            pat[k] *= n_rel - i
+    if _numba_loaded:
+        _plain_kernel(x, ord, lag, pat)
+    else:
+        _plain_numpy(x, ord, lag, pat)
 
     return pat
 
 
-def encode_overlap(x, ord, lag, trustme=False):
+def encode_overlap(x, ord, lag, trustme=False, out=None):
     """
     Extract and encode ordinal patterns using the 'overlap' algorithm.
 
@@ -169,8 +319,9 @@ def encode_overlap(x, ord, lag, trustme=False):
     ----------
     x : array_like
         Time series data to be encoded. Can be multi-dimensional, and must be
-        convertible to an ndarray of data type 'double'. The input array is
-        flattened prior to encoding.
+        convertible to an ndarray of data type 'double'. Arrays of data type
+        'float32' are used without conversion. The input array is flattened
+        prior to encoding.
 
     ord : int
         Order of the encoding, an integer between 2 and 20.
@@ -181,7 +332,13 @@ def encode_overlap(x, ord, lag, trustme=False):
 
     trustme : bool, optional
         If set to True, the function arguments are not validated before
-        processing. This will speed up the calculation.
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double' or 'float32'.
+
+    out : ndarray of uint64, optional
+        Array in which the result is stored. It must be C-contiguous, and
+        have the same shape as the returned array. By default, a new array
+        is allocated.
 
     Returns
     -------
@@ -191,41 +348,20 @@ def encode_overlap(x, ord, lag, trustme=False):
 
     """
     if not trustme:
-        x = _utils.prepare_input_data(x, ord, lag)
+        x = _utils.prepare_input_data(x, ord, lag, allow_float32=True)
         if ord > 20:
             raise ValueError("overlap algorithm does not support ord > 20")
 
     n_rel = ord - 1                # number of order relations
     n_pat = x.size - n_rel * lag   # sequence length
 
-    pat = _np.zeros(n_pat, dtype=_np.uint64)
-
-    ranks = _np.zeros([lag, n_rel], dtype=_np.uint8)
-
-    radix = [_factorial(r) for r in range(n_rel, 0, -1)]
-    radix = _np.array(radix, dtype=_np.uint64)
-
-    for k in range(0, lag):
-        for i in range(0, n_rel - 1):
-            for j in range(i + 1, n_rel):
-                ranks[k, i + 1] += x[k + i*lag] > x[k + j*lag]
-
-    i = 0
-
-    for k in range(0, n_pat):
-        ranks[i] = _np.roll(ranks[i], -1)
-        ranks[i, -1] = 0
-
-        updates = x[k:k + n_rel*lag:lag] > x[k + n_rel*lag]
-        ranks[i] += updates
-
-        pat[k] = _np.matmul(radix, ranks[i])
-        i = (i + 1) % lag
+    pat = _utils.output_array(out, (n_pat,), trustme)
+    _overlap_kernel(x, ord, lag, pat)
 
     return pat
 
 
-def encode_lookup(x, ord, lag, tab, trustme=False):
+def encode_lookup(x, ord, lag, tab, trustme=False, out=None):
     """
     Extract and encode ordinal patterns using the 'lookup' algorithm.
 
@@ -233,8 +369,9 @@ def encode_lookup(x, ord, lag, tab, trustme=False):
     ----------
     x : array_like
         Time series data to be encoded. Can be multi-dimensional, and must be
-        convertible to an ndarray of data type 'double'. The input array is
-        flattened prior to encoding.
+        convertible to an ndarray of data type 'double'. Arrays of data type
+        'float32' are used without conversion. The input array is flattened
+        prior to encoding.
 
     ord : int
         Order of the encoding, an integer between 2 and 10.
@@ -243,14 +380,20 @@ def encode_lookup(x, ord, lag, tab, trustme=False):
         Time lag used for creating embedding vectors. Must be a positive
         integer.
 
-    tab : ndarray of uint64
+    tab : ndarray of uint16, uint32 or uint64
         A lookup table containing factorial(ord) * ord pattern codes, as
         returned by the `create_lookup_table` function. Note that custom
         mappings are NOT supported, and will lead to undefined behaviour.
 
     trustme : bool, optional
         If set to True, the function arguments are not validated before
-        processing. This will speed up the calculation.
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double' or 'float32'.
+
+    out : ndarray of uint64, optional
+        Array in which the result is stored. It must be C-contiguous, and
+        have the same shape as the returned array. By default, a new array
+        is allocated.
 
     Returns
     -------
@@ -260,7 +403,7 @@ def encode_lookup(x, ord, lag, tab, trustme=False):
 
     """
     if not trustme:
-        x = _utils.prepare_input_data(x, ord, lag)
+        x = _utils.prepare_input_data(x, ord, lag, allow_float32=True)
         if ord > 10:
             raise ValueError("lookup algorithm does not support ord > 10")
 
@@ -269,26 +412,21 @@ def encode_lookup(x, ord, lag, tab, trustme=False):
     n_rel = ord - 1
     n_pat = x.size - n_rel * lag
 
-    pat = _np.zeros(n_pat, dtype=_np.uint64)
-
-    for i in range(0, lag):
-        pat[i] = _encode_pattern(x[i:i + ord*lag:lag])
+    pat = _utils.output_array(out, (n_pat,), trustme)
 
     next_val = x[n_rel*lag:]
     ranks = _np.zeros(next_val.shape, _np.uint8)
 
+    # One pass per order relation over contiguous views is much faster than
+    # a single pass over a sliding window view, whose rows are short.
     for i in range(0, n_rel):
         ranks += x[i*lag : (i - n_rel)*lag] > next_val
 
-    for i in range(lag, n_pat):
-        pat[i] = tab[pat[i - lag], ranks[i]]
+    _lookup_kernel(x, ord, lag, ranks, tab, pat)
 
     return pat
 
 
-_scope = {'order': None, 'lag': None, 'cmd': None}
-
-
 def encode_vectorised(x, ord, lag, axis=-1, trustme=False):
     """
     Extract and encode ordinal patterns using the 'vectorised' algorithm.
@@ -297,7 +435,10 @@ def encode_vectorised(x, ord, lag, axis=-1, trustme=False):
     ----------
     x : array_like
         Time series data to be encoded. Can be multi-dimensional, and must be
-        convertible to an ndarray of data type 'double'.
+        convertible to an ndarray of data type 'double'. Arrays of data type
+        'float32' are used without conversion. All time series along `axis`
+        are encoded at once, so there is no need to call the function
+        separately for each trial or channel of a data set.
 
     ord : int
         Order of the encoding, an integer between 2 and 20.
@@ -312,7 +453,8 @@ def encode_vectorised(x, ord, lag, axis=-1, trustme=False):
 
     trustme : bool, optional
         If set to True, the function arguments are not validated before
-        processing. This will speed up the calculation.
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double' or 'float32'.
 
     Returns
     -------
@@ -325,44 +467,100 @@ def encode_vectorised(x, ord, lag, axis=-1, trustme=False):
 
     """
     if not trustme:
-        x = _utils.prepare_input_data(x, ord, lag, axis)
+        x = _utils.prepare_input_data(x, ord, lag, axis,
+                                      allow_float32=True)
         if ord > 20:
             raise ValueError("vectorised algorithm does not support ord > 20")
 
-    _scope['x'] = _np.moveaxis(x, axis, 0)
+    n_rel = ord - 1   # number of order relations
 
-    if (_scope['order'] != ord) or (_scope['lag'] != lag):
-        cmd = ""
-        for idx in range(1, ord + 1):
-            fwd = (idx - 1)*lag;
-            rev = (ord - idx)*lag;
-            cmd += "x{0} = x[{1}:{2}]\n".format(idx, fwd, -rev or None)
+    # _plain_numpy encodes along the last axis. In the common case of `axis`
+    # being the last axis already, no transposed views are created.
+    move = axis % x.ndim != x.ndim - 1
 
-        cmd += "\ny = "
+    if move:
+        x = _np.moveaxis(x, axis, -1)
 
-        word_size = _utils.pattern_word_size(ord)
-        for i in range(1, ord):
-            cmd += "{0} * (".format(_factorial(ord - i))
-            cmd += "(x{0} > x{1})".format(i, i + 1)
-            cmd += ".astype(_np.uint8)"
+    n_pat = x.shape[-1] - n_rel * lag
 
-            for j in range(i + 2, ord + 1):
-                cmd += " + (x{0} > x{1})".format(i, j)
+    pat = _np.empty(x.shape[:-1] + (n_pat,), dtype=_np.uint64)
+    _plain_numpy(x, ord, lag, pat)
 
-            cmd += ").astype(_np.uint{0})".format(word_size)
+    if move:
+        pat = _np.moveaxis(pat, -1, axis)
 
-            if i == ord - 1:
-                cmd += "\n"
-            else:
-                cmd += " + \\\n" + " "*4
+    return pat
 
-        _scope['cmd'] = compile(cmd, "<string>", "exec")
-        _scope['order'] = ord
-        _scope['lag'] = lag
 
-    exec(_scope['cmd'], None, _scope)
+def encode_argsort(x, ord, lag, axis=-1, trustme=False):
+    """
+    Extract and encode ordinal patterns using the 'argsort' algorithm.
 
-    pat = _scope['y']
-    pat = _np.moveaxis(pat, 0, axis)
+    Instead of comparing the elements of each embedding vector pairwise,
+    the elements are ranked by sorting, and the pattern code is derived
+    from the ranks. This is mainly meant for cross-checking: with NumPy,
+    the 'vectorised' algorithm is considerably faster. Equal values and
+    NaN are handled as in the comparison-based algorithms.
 
-    return pat.astype(_np.uint64)
+    Parameters
+    ----------
+    x : array_like
+        Time series data to be encoded. Can be multi-dimensional, and must be
+        convertible to an ndarray of data type 'double'. Arrays of data type
+        'float32' are used without conversion. All time series along `axis`
+        are encoded at once, using a sliding window view of `x`.
+
+    ord : int
+        Order of the encoding, an integer between 2 and 20.
+
+    lag : int
+        Time lag used for creating embedding vectors. Must be a positive
+        integer.
+
+    axis : int, optional
+        The axis of the input data along which the extraction shall be
+        performed. By default, the last axis is used.
+
+    trustme : bool, optional
+        If set to True, the function arguments are not validated before
+        processing. This will speed up the calculation.
+
+    Returns
+    -------
+    pat : ndarray of uint64
+        Each value represents an ordinal pattern.  The shape of the `pat`
+        array is equal to the input array `x`, except for the axis on
+        which the encoding is performed. For this axis, it holds that
+
+          ``pat.shape[axis] == x.shape[axis] - (ord - 1) * lag``.
+
+    """
+    if not trustme:
+        x = _utils.prepare_input_data(x, ord, lag, axis,
+                                      allow_float32=True)
+        if ord > 20:
+            raise ValueError("argsort algorithm does not support ord > 20")
+
+    n_rel = ord - 1   # number of order relations
+
+    # Embedding vectors along a new last axis, in place of which `axis`
+    # indexes the patterns. (This is a view, not a copy.)
+    emb = _np.lib.stride_tricks.sliding_window_view(x, n_rel*lag + 1, axis)
+    emb = emb[..., ::lag]
+
+    # In the comparison-based algorithms, any comparison involving NaN is
+    # false. No ranking can reproduce this, as such comparisons do not
+    # define an order. Instead, pairs involving NaN are masked out.
+    nan = _np.isnan(x)
+
+    if nan.any():
+        valid = _np.lib.stride_tricks.sliding_window_view(~nan,
+                                                          n_rel*lag + 1, axis)
+        valid = valid[..., ::lag]
+    else:
+        valid = None
+
+    pat = _np.empty(emb.shape[:-1], dtype=_np.uint64)
+    _argsort_numpy(emb, pat, valid)
+
+    return pat
@@ -45,6 +45,11 @@ Upon import of the module, the library file
 
 must be installed somewhere in the system's library search path.
 
+The library functions are called through ctypes, which releases the global
+interpreter lock (GIL) for the duration of each call. As the encoding
+functions are reentrant, multiple time series can thus be encoded in
+parallel from multiple Python threads.
+
 """
 from __future__ import division as _division
 
@@ -69,18 +74,37 @@ elif _os.name == "posix":
 else:
     raise OSError("operating system not supported")
 
-# two useful ndpointer instances
+# some useful ndpointer instances
+_ptr_uint16 = _np.ctypeslib.ndpointer(dtype=_np.uint16, flags=("C", "A"))
+_ptr_uint32 = _np.ctypeslib.ndpointer(dtype=_np.uint32, flags=("C", "A"))
 _ptr_uint64 = _np.ctypeslib.ndpointer(dtype=_np.uint64, flags=("C", "A"))
 _ptr_double = _np.ctypeslib.ndpointer(dtype=_np.double, flags=("C", "A"))
 
 # try to load the shared library
 _lib = _ctypes.cdll[_filename]
 
-_lib.ordpat_create_lookup_table.argtypes = [
+# Lookup tables are created with the smallest data type sufficient, see
+# utils.lookup_table_dtype. There is one library function for each type.
+_lib.ordpat_create_lookup_table.restype      = _ctypes.c_int
+_lib.ordpat_create_lookup_table.argtypes     = [
     _ptr_uint64,      # pointer to output array
     _ctypes.c_size_t, # size of array
     _ctypes.c_uint    # pattern order
     ]
+_lib.ordpat_create_lookup_table_u32.restype  = _ctypes.c_int
+_lib.ordpat_create_lookup_table_u32.argtypes = [
+    _ptr_uint32, _ctypes.c_size_t, _ctypes.c_uint
+    ]
+_lib.ordpat_create_lookup_table_u16.restype  = _ctypes.c_int
+_lib.ordpat_create_lookup_table_u16.argtypes = [
+    _ptr_uint16, _ctypes.c_size_t, _ctypes.c_uint
+    ]
+
+_create_lookup_table = {
+    _np.uint16 : _lib.ordpat_create_lookup_table_u16,
+    _np.uint32 : _lib.ordpat_create_lookup_table_u32,
+    _np.uint64 : _lib.ordpat_create_lookup_table
+    }
 
 _lib.ordpat_xorshift_rand_double.restype  = None
 _lib.ordpat_xorshift_rand_double.argtypes = [
@@ -99,12 +123,84 @@ _encode_argtypes = [
     _ctypes.c_uint    # time lag
     ]
 
+_lib.ordpat_encode_plain.restype       = _ctypes.c_int
 _lib.ordpat_encode_plain.argtypes      = _encode_argtypes
+_lib.ordpat_encode_overlap.restype     = _ctypes.c_int
 _lib.ordpat_encode_overlap.argtypes    = _encode_argtypes
+_lib.ordpat_encode_overlap_mp.restype  = _ctypes.c_int
 _lib.ordpat_encode_overlap_mp.argtypes = _encode_argtypes
 
-# In addition, 'ordpat_encode_lookup' requires a pointer to a lookup table.
-_lib.ordpat_encode_lookup.argtypes = _encode_argtypes + [_ptr_uint64]
+# The batch variant of 'ordpat_encode_overlap' processes multiple time series
+# of equal length at once.
+_lib.ordpat_encode_overlap_batch.restype  = _ctypes.c_int
+_lib.ordpat_encode_overlap_batch.argtypes = [
+    _ptr_double,      # input array
+    _ctypes.c_size_t, # number of time series
+    _ctypes.c_size_t, # length of each time series
+    _ptr_uint64,      # output array
+    _ctypes.c_size_t, # length of each output sequence
+    _ctypes.c_uint,   # pattern order
+    _ctypes.c_uint    # time lag
+    ]
+
+# In addition, 'ordpat_encode_lookup' requires a pointer to a lookup table,
+# with one variant of the function for each data type of the table.
+_lib.ordpat_encode_lookup.restype      = _ctypes.c_int
+_lib.ordpat_encode_lookup.argtypes     = _encode_argtypes + [_ptr_uint64]
+_lib.ordpat_encode_lookup_u32.restype  = _ctypes.c_int
+_lib.ordpat_encode_lookup_u32.argtypes = _encode_argtypes + [_ptr_uint32]
+_lib.ordpat_encode_lookup_u16.restype  = _ctypes.c_int
+_lib.ordpat_encode_lookup_u16.argtypes = _encode_argtypes + [_ptr_uint16]
+
+_encode_lookup = {
+    _np.uint16 : _lib.ordpat_encode_lookup_u16,
+    _np.uint32 : _lib.ordpat_encode_lookup_u32,
+    _np.uint64 : _lib.ordpat_encode_lookup
+    }
+
+# If the caller vouches for its arguments ('trustme'), arrays are passed as
+# plain pointers, which saves the validation overhead of ndpointer. Separate
+# function objects are needed for this, because ctypes caches the ones above.
+_fast_argtypes = [
+    _ctypes.c_void_p, # input array
+    _ctypes.c_size_t, # size of input array
+    _ctypes.c_void_p, # output array
+    _ctypes.c_size_t, # size of output array
+    _ctypes.c_uint,   # pattern order
+    _ctypes.c_uint    # time lag
+    ]
+
+_fast_encode_plain      = _lib["ordpat_encode_plain"]
+_fast_encode_overlap    = _lib["ordpat_encode_overlap"]
+_fast_encode_overlap_mp = _lib["ordpat_encode_overlap_mp"]
+_fast_encode_lookup     = {
+    _np.uint16 : _lib["ordpat_encode_lookup_u16"],
+    _np.uint32 : _lib["ordpat_encode_lookup_u32"],
+    _np.uint64 : _lib["ordpat_encode_lookup"]
+    }
+
+_fast_encode_plain.restype       = _ctypes.c_int
+_fast_encode_plain.argtypes      = _fast_argtypes
+_fast_encode_overlap.restype     = _ctypes.c_int
+_fast_encode_overlap.argtypes    = _fast_argtypes
+_fast_encode_overlap_mp.restype  = _ctypes.c_int
+_fast_encode_overlap_mp.argtypes = _fast_argtypes
+
+_fast_encode_overlap_batch          = _lib["ordpat_encode_overlap_batch"]
+_fast_encode_overlap_batch.restype  = _ctypes.c_int
+_fast_encode_overlap_batch.argtypes = [
+    _ctypes.c_void_p, # input array
+    _ctypes.c_size_t, # number of time series
+    _ctypes.c_size_t, # length of each time series
+    _ctypes.c_void_p, # output array
+    _ctypes.c_size_t, # length of each output sequence
+    _ctypes.c_uint,   # pattern order
+    _ctypes.c_uint    # time lag
+    ]
+
+for _fcn in _fast_encode_lookup.values():
+    _fcn.restype  = _ctypes.c_int
+    _fcn.argtypes = _fast_argtypes + [_ctypes.c_void_p]
 
 
 def _raise_api_error(ret):
@@ -133,9 +229,10 @@ def create_lookup_table(ord):
 
     Returns
     -------
-    table : ndarray of uint64
+    table : ndarray of uint16 or uint32
         A lookup table containing factorial(ord) * ord pattern codes.
-        Each code is a value between 0 and factorial(ord) - 1.
+        Each code is a value between 0 and factorial(ord) - 1, stored in
+        the smallest data type sufficient (uint16 for `ord` <= 8).
 
     """
     if not _utils.is_scalar_int(ord):
@@ -144,8 +241,9 @@ def create_lookup_table(ord):
     if ord < 2 or ord > 10:
         raise ValueError("order must be between 2 and 10")
 
-    table = _np.empty((_factorial(ord), ord), dtype=_np.uint64)
-    ret = _lib.ordpat_create_lookup_table(table, table.size, ord)
+    dtype = _utils.lookup_table_dtype(ord)
+    table = _np.empty((_factorial(ord), ord), dtype=dtype)
+    ret = _create_lookup_table[dtype](table, table.size, ord)
 
     if not ret == 0:
         _raise_api_error(ret)
@@ -153,7 +251,7 @@ def create_lookup_table(ord):
     return table
 
 
-def encode_plain(x, ord, lag, trustme=False):
+def encode_plain(x, ord, lag, trustme=False, out=None):
     """
     Extract and encode ordinal patterns using the 'plain' algorithm.
 
@@ -173,7 +271,13 @@ def encode_plain(x, ord, lag, trustme=False):
 
     trustme : bool, optional
         If set to True, the function arguments are not validated before
-        processing. This will speed up the calculation.
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double'.
+
+    out : ndarray of uint64, optional
+        Array in which the result is stored. It must be C-contiguous, and
+        have the same shape as the returned array. By default, a new array
+        is allocated.
 
     Returns
     -------
@@ -190,9 +294,13 @@ def encode_plain(x, ord, lag, trustme=False):
 
     n_pat = x.size - (ord - 1) * lag
 
-    pat = _np.empty(n_pat , dtype=_np.uint64)
+    pat = _utils.output_array(out, (n_pat,), trustme)
 
-    ret = _lib.ordpat_encode_plain(x, x.size, pat, pat.size, ord, lag)
+    if trustme:
+        ret = _fast_encode_plain(x.ctypes.data, x.size,
+                                 pat.ctypes.data, pat.size, ord, lag)
+    else:
+        ret = _lib.ordpat_encode_plain(x, x.size, pat, pat.size, ord, lag)
 
     if not ret == 0:
         _raise_api_error(ret)
@@ -200,7 +308,7 @@ def encode_plain(x, ord, lag, trustme=False):
     return pat
 
 
-def encode_overlap(x, ord, lag, trustme=False):
+def encode_overlap(x, ord, lag, trustme=False, out=None):
     """
     Extract and encode ordinal patterns using the 'overlap' algorithm.
 
@@ -220,7 +328,13 @@ def encode_overlap(x, ord, lag, trustme=False):
 
     trustme : bool, optional
         If set to True, the function arguments are not validated before
-        processing. This will speed up the calculation.
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double'.
+
+    out : ndarray of uint64, optional
+        Array in which the result is stored. It must be C-contiguous, and
+        have the same shape as the returned array. By default, a new array
+        is allocated.
 
     Returns
     -------
@@ -237,9 +351,13 @@ def encode_overlap(x, ord, lag, trustme=False):
 
     n_pat = x.size - (ord - 1) * lag
 
-    pat = _np.empty(n_pat , dtype=_np.uint64)
+    pat = _utils.output_array(out, (n_pat,), trustme)
 
-    ret = _lib.ordpat_encode_overlap(x, x.size, pat, pat.size, ord, lag)
+    if trustme:
+        ret = _fast_encode_overlap(x.ctypes.data, x.size,
+                                   pat.ctypes.data, pat.size, ord, lag)
+    else:
+        ret = _lib.ordpat_encode_overlap(x, x.size, pat, pat.size, ord, lag)
 
     if not ret == 0:
         _raise_api_error(ret)
@@ -247,7 +365,74 @@ def encode_overlap(x, ord, lag, trustme=False):
     return pat
 
 
-def encode_overlap_mp(x, ord, lag, trustme=False):
+def encode_overlap_batch(x, ord, lag, trustme=False, out=None):
+    """
+    Encode multiple time series at once using the 'overlap' algorithm.
+
+    All time series are processed in a single call to the C library, which
+    saves the overhead of calling `encode_overlap` for each of them.
+
+    Parameters
+    ----------
+    x : array_like
+        Time series data to be encoded. Must be two-dimensional, with each
+        row representing a time series, and convertible to an ndarray of
+        data type 'double'.
+
+    ord : int
+        Order of the encoding, an integer between 2 and 20.
+
+    lag : int
+        Time lag used for creating embedding vectors. Must be a positive
+        integer.
+
+    trustme : bool, optional
+        If set to True, the function arguments are not validated before
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double'.
+
+    out : ndarray of uint64, optional
+        Array in which the result is stored. It must be C-contiguous, and
+        have the same shape as the returned array. By default, a new array
+        is allocated.
+
+    Returns
+    -------
+    pat : ndarray of uint64
+        Two-dimensional array, with each row containing the ordinal patterns
+        of the respective row of `x`. It holds that
+
+          ``pat.shape == (x.shape[0], x.shape[1] - (ord - 1) * lag)``.
+
+    """
+    if not trustme:
+        if _np.ndim(x) != 2:
+            raise ValueError("x must be two-dimensional")
+
+        x = _utils.prepare_input_data(x, ord, lag, -1)
+
+        if ord > 20:
+            raise ValueError("overlap algorithm does not support ord > 20")
+
+    n_ser, n_in = x.shape
+    n_pat = n_in - (ord - 1) * lag
+
+    pat = _utils.output_array(out, (n_ser, n_pat), trustme)
+
+    if trustme:
+        ret = _fast_encode_overlap_batch(x.ctypes.data, n_ser, n_in,
+                                         pat.ctypes.data, n_pat, ord, lag)
+    else:
+        ret = _lib.ordpat_encode_overlap_batch(x, n_ser, n_in, pat, n_pat,
+                                               ord, lag)
+
+    if not ret == 0:
+        _raise_api_error(ret)
+
+    return pat
+
+
+def encode_overlap_mp(x, ord, lag, trustme=False, out=None):
     """
     Extract and encode ordinal patterns using the 'overlap_mp' algorithm.
 
@@ -267,7 +452,13 @@ def encode_overlap_mp(x, ord, lag, trustme=False):
 
     trustme : bool, optional
         If set to True, the function arguments are not validated before
-        processing. This will speed up the calculation.
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double'.
+
+    out : ndarray of uint64, optional
+        Array in which the result is stored. It must be C-contiguous, and
+        have the same shape as the returned array. By default, a new array
+        is allocated.
 
     Returns
     -------
@@ -289,21 +480,23 @@ def encode_overlap_mp(x, ord, lag, trustme=False):
     n_pat = x.size - (ord - 1) * lag
 
     width = _utils.pattern_uint64_width(ord)
-    n_pat *= width
 
-    pat = _np.empty(n_pat, dtype=_np.uint64)
+    pat = _utils.output_array(out, (n_pat, width), trustme)
 
-    ret = _lib.ordpat_encode_overlap_mp(x, x.size, pat, pat.size, ord, lag)
+    if trustme:
+        ret = _fast_encode_overlap_mp(x.ctypes.data, x.size,
+                                      pat.ctypes.data, pat.size, ord, lag)
+    else:
+        ret = _lib.ordpat_encode_overlap_mp(x, x.size, pat, pat.size,
+                                            ord, lag)
 
     if not ret == 0:
         _raise_api_error(ret)
 
-    pat = pat.reshape((-1, width))
-
     return pat
 
 
-def encode_lookup(x, ord, lag, tab, trustme=False):
+def encode_lookup(x, ord, lag, tab, trustme=False, out=None):
     """
     Extract and encode ordinal patterns using the 'lookup' algorithm.
 
@@ -321,14 +514,20 @@ def encode_lookup(x, ord, lag, tab, trustme=False):
         Time lag used for creating embedding vectors. Must be a positive
         integer.
 
-    tab : ndarray of uint64
+    tab : ndarray of uint16, uint32 or uint64
         A lookup table containing factorial(ord) * ord pattern codes, as
         returned by the `create_lookup_table` function. Note that custom
         mappings are NOT supported, and will lead to undefined behaviour.
 
     trustme : bool, optional
         If set to True, the function arguments are not validated before
-        processing. This will speed up the calculation.
+        processing. This will speed up the calculation. In this case, `x`
+        must be a C-contiguous ndarray of data type 'double'.
+
+    out : ndarray of uint64, optional
+        Array in which the result is stored. It must be C-contiguous, and
+        have the same shape as the returned array. By default, a new array
+        is allocated.
 
     Returns
     -------
@@ -347,9 +546,15 @@ def encode_lookup(x, ord, lag, tab, trustme=False):
 
     n_pat = x.size - (ord - 1) * lag
 
-    pat = _np.empty(n_pat , dtype=_np.uint64)
+    pat = _utils.output_array(out, (n_pat,), trustme)
 
-    ret = _lib.ordpat_encode_lookup(x, x.size, pat, pat.size, ord, lag, tab)
+    if trustme:
+        ret = _fast_encode_lookup[tab.dtype.type](x.ctypes.data, x.size,
+                                                   pat.ctypes.data, pat.size,
+                                                   ord, lag, tab.ctypes.data)
+    else:
+        ret = _encode_lookup[tab.dtype.type](x, x.size, pat, pat.size, ord,
+                                             lag, tab)
 
     if not ret == 0:
         _raise_api_error(ret)
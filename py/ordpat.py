@@ -52,7 +52,10 @@ For a detailed description of the algorithms used, see the article:
 
 """
 from __future__ import division as _division
+import os as _os
 import numpy as _np
+from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+from functools import lru_cache as _lru_cache
 
 import encoders as native
 import utils as _utils
@@ -69,38 +72,70 @@ except OSError:
         """
         WARNING: The libordpat C library was not found.
         """
-        encode_lookup     = None
-        encode_overlap    = None
-        encode_overlap_mp = None
-        encode_plain      = None
+        encode_lookup        = None
+        encode_overlap       = None
+        encode_overlap_mp    = None
+        encode_overlap_batch = None
+        encode_plain         = None
 
     _library_loaded = False
     print("WARNING: Could not find the C library.")
 
-# This is used to keep the last lookup table in memory, such that multiple
-# calls using the same pattern order do not have to recreate a lookup table
-# each time.
-_lookup_buf = {'order': None, 'table': None}
+# Large lookup tables are cached on disk. The platformdirs package is used to
+# determine the cache directory if available, but is not required.
+try:
+    from platformdirs import user_cache_dir as _user_cache_dir
+except ImportError:
+    def _user_cache_dir(appname):
+        if _os.name == "nt":
+            base = _os.environ.get("LOCALAPPDATA", _os.path.expanduser("~"))
+        else:
+            base = _os.environ.get("XDG_CACHE_HOME",
+                                   _os.path.join(_os.path.expanduser("~"),
+                                                 ".cache"))
+
+        return _os.path.join(base, appname)
+
+# Minimum order of lookup tables cached on disk. Smaller tables are created
+# in a matter of milliseconds.
+_LOOKUP_DISK_MIN_ORDER = 9
+
+
+# Default number of threads, one per CPU.
+_CPU_COUNT = _os.cpu_count() or 1
+
+# Minimum number of samples per thread when encoding multiple time series
+# in parallel, such that the work of each thread outweighs its overhead.
+_THREAD_MIN_SAMPLES = 2**16
 
 
 # This data structure describes all the algorithms available, including their
 # maximum pattern order, respective function call, as well as a flag that
-# indicates whether the libordpat C library is required.
+# indicates whether the libordpat C library is required. Algorithms that can
+# encode multiple time series in a single call also list a batch function.
 _algorithms = {
+    'argsort' : {
+        'max_order' : 20,
+        'c_lib'     : False,
+        'fcn'       : native.encode_argsort
+        },
+
     'lookup' : {
         'max_order' : 10,
         'c_lib'     : False,
-        'fcn'       : lambda x, ord, lag, trustme : \
-                      native.encode_lookup(x, ord, lag, _lookup_buf['table'],
-                                           trustme)
+        'fcn'       : lambda x, ord, lag, trustme, out=None: \
+                      native.encode_lookup(x, ord, lag,
+                                           _get_lookup_table(ord),
+                                           trustme, out)
         },
 
     'lookup_c' : {
         'max_order' : 10,
         'c_lib'     : True,
-        'fcn'       : lambda x, ord, lag, trustme: \
-                      library.encode_lookup(x, ord, lag, _lookup_buf['table'],
-                                            trustme)
+        'fcn'       : lambda x, ord, lag, trustme, out=None: \
+                      library.encode_lookup(x, ord, lag,
+                                            _get_lookup_table(ord),
+                                            trustme, out)
         },
 
     'overlap' : {
@@ -112,7 +147,8 @@ _algorithms = {
     'overlap_c' : {
         'max_order' : 20,
         'c_lib'     : True,
-        'fcn'       : library.encode_overlap
+        'fcn'       : library.encode_overlap,
+        'batch_fcn' : library.encode_overlap_batch
         },
 
     'overlap_mp_c' : {
@@ -141,14 +177,67 @@ _algorithms = {
     }
 
 
-def _update_lookup_table(ord):
-    if _lookup_buf['order'] != ord:
-        if _library_loaded:
-            _lookup_buf['table'] = library.create_lookup_table(ord);
-        else:
-            _lookup_buf['table'] = native.create_lookup_table(ord);
+def _load_lookup_table(path, ord):
+    # Return None unless `path` holds a valid lookup table of order `ord`.
+    try:
+        tab = _np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+    try:
+        _utils.check_lookup_table(tab, ord)
+    except (TypeError, ValueError):
+        return None
+
+    if tab.dtype != _utils.lookup_table_dtype(ord):
+        return None
+
+    return tab
+
+
+def _save_lookup_table(path, tab):
+    # Write to a temporary file first, such that other processes never see
+    # an incomplete table. Failure is not an error, but means no caching.
+    tmp = "{}.{}.tmp".format(path, _os.getpid())
+
+    try:
+        _os.makedirs(_os.path.dirname(path), exist_ok=True)
+
+        with open(tmp, "wb") as f:
+            _np.save(f, tab)
 
-        _lookup_buf['order'] = ord;
+        _os.replace(tmp, path)
+    except OSError:
+        try:
+            _os.remove(tmp)
+        except OSError:
+            pass
+
+
+# Lookup tables are kept in memory, such that multiple calls using the same
+# pattern order do not have to recreate a lookup table each time. There are
+# only nine orders to be cached (2 to 10), hence no size limit is imposed.
+# Large tables are also cached on disk, and memory-mapped when loaded.
+@_lru_cache(maxsize=None)
+def _get_lookup_table(ord):
+    if _library_loaded:
+        create = library.create_lookup_table
+    else:
+        create = native.create_lookup_table
+
+    if ord < _LOOKUP_DISK_MIN_ORDER:
+        return create(ord)
+
+    path = _os.path.join(_user_cache_dir("libordpat"),
+                         "lookup_table_ord{}_v1.npy".format(ord))
+
+    tab = _load_lookup_table(path, ord)
+
+    if tab is None:
+        tab = create(ord)
+        _save_lookup_table(path, tab)
+
+    return tab
 
 
 def _check_algorithm(ord, alg):
@@ -180,7 +269,17 @@ def _check_algorithm(ord, alg):
     return alg
 
 
-def ordpat(x, ord, lag=1, algorithm=None, axis=-1):
+def _encode_rows(alg_info, x, ord, lag, pat, beg, end):
+    if 'batch_fcn' in alg_info:
+        alg_info['batch_fcn'](x[beg:end], ord, lag, True, pat[beg:end])
+    else:
+        enc_fnc = alg_info['fcn']
+
+        for i in range(beg, end):
+            enc_fnc(x[i], ord, lag, True, pat[i])
+
+
+def ordpat(x, ord, lag=1, algorithm=None, axis=-1, n_threads=None):
     """
     Return a sequence of ordinal patterns in numerical representation.
 
@@ -195,7 +294,8 @@ def ordpat(x, ord, lag=1, algorithm=None, axis=-1):
     ----------
     x : array_like
         Time series data to be encoded. Can be multi-dimensional, and must be
-        convertible to an ndarray of data type 'double'.
+        convertible to an ndarray of data type 'double'. The native
+        algorithms process arrays of data type 'float32' without conversion.
 
     ord : int
         Order of the encoding, an integer greater than 2. The upper bound is
@@ -206,7 +306,7 @@ def ordpat(x, ord, lag=1, algorithm=None, axis=-1):
         integer.
 
     algorithm : {'plain', 'plain_c', 'overlap', 'overlap_c', 'overlap_mp_c',
-                 'lookup', 'lookup_c', 'vectorised'}, optional
+                 'lookup', 'lookup_c', 'vectorised', 'argsort'}, optional
         One of the encoding algorithms described below. By default, the
         algorithm is selected automatically.
 
@@ -214,6 +314,11 @@ def ordpat(x, ord, lag=1, algorithm=None, axis=-1):
         The axis of the input data along which the extraction shall be
         performed. By default, the last axis is used.
 
+    n_threads : int, optional
+        Maximum number of threads used for encoding multiple time series in
+        parallel. This applies to the algorithms of the C library only. By
+        default, one thread per CPU is used.
+
     Returns
     -------
     pat : ndarray of uint64
@@ -239,10 +344,11 @@ def ordpat(x, ord, lag=1, algorithm=None, axis=-1):
     --------------------------------------------------------------------------
     ALGORITHM    MAX ORD    NEEDS C LIBRARY    REMARKS
     --------------------------------------------------------------------------
-    lookup            10                 no
-    overlap           20                 no
-    plain             20                 no    Very slow.
-    vectorised        20                 no    Best native choice.
+    argsort           20                 no    Slow, sorting-based.
+    lookup            10                 no    Fast for ord <= 8 with Numba.
+    overlap           20                 no    Fast for high orders with Numba.
+    plain             20                 no    Multi-threaded with Numba.
+    vectorised        20                 no    Fast for small orders.
     --------------------------------------------------------------------------
     lookup_c          10                yes    Fast for small orders.
     overlap_c         20                yes    Good general-purpose algorithm.
@@ -250,6 +356,11 @@ def ordpat(x, ord, lag=1, algorithm=None, axis=-1):
     plain_c           20                yes
     --------------------------------------------------------------------------
 
+    If Numba is available, the native 'lookup', 'overlap' and 'plain'
+    algorithms are compiled to machine code on first use. Without Numba,
+    'lookup' and 'overlap' are executed by the interpreter, and are very
+    slow, whereas 'plain' uses the NumPy code of 'vectorised'.
+
     The 'overlap_mp_c' algorithm supports very high pattern orders.
     When using this algorithm, the last dimension of the returned array
     indexes the 64-bit wide elements of each single ordinal pattern.
@@ -262,15 +373,152 @@ def ordpat(x, ord, lag=1, algorithm=None, axis=-1):
     each such pattern requires two 64-bit values.
 
     """
-    x = _utils.prepare_input_data(x, ord, lag, axis)
+    x = _utils.prepare_input_data(x, ord, lag, axis, allow_float32=True)
+
+    return _ordpat(x, ord, lag, algorithm, axis, n_threads)
+
+
+def _as_rows(x, axis, dtype):
+    # Arrange the time series as rows of a 2D array. Each row needs to be
+    # contiguous in memory, as the encoding functions are called with
+    # trustme=True. (Moving axes has a notable overhead for short time
+    # series, hence this is skipped where possible.)
+    if axis != x.ndim - 1:
+        x = _np.moveaxis(x, axis, -1)
+
+    shape = x.shape[:-1]
+    rows  = _np.ascontiguousarray(x, dtype=dtype).reshape((-1, x.shape[-1]))
+
+    return rows, shape
+
+
+def _ordpat(x, ord, lag, algorithm, axis, n_threads, row_cache=None):
+    # Encode data already checked and converted by prepare_input_data. If a
+    # dictionary `row_cache` is given, the 2D arrangement of the time series
+    # is stored in it, keyed by data type, and reused on subsequent calls.
     alg = _check_algorithm(ord, algorithm)
+    alg_info = _algorithms[alg]
+
+    if n_threads is None:
+        n_threads = _CPU_COUNT
+    elif not _utils.is_scalar_int(n_threads):
+        raise TypeError("n_threads must be None or a scalar integer")
+    elif n_threads < 1:
+        raise ValueError("n_threads must be positive")
 
-    enc_fnc = _algorithms[alg]['fcn']
+    # (Integral floats pass the check above, but are not valid counts.)
+    n_threads = int(n_threads)
 
+    # Create the lookup table now if necessary, rather than in one of the
+    # threads below.
     if alg in ("lookup", "lookup_c"):
-        _update_lookup_table(ord)
+        _get_lookup_table(ord)
+
+    # These algorithms encode all time series in a single call.
+    if alg in ("argsort", "vectorised"):
+        return alg_info['fcn'](x, ord, lag, axis, True)
+
+    # The C library supports double data only. (A dtype object rather than
+    # the scalar type is used, as both are equal but hash differently when
+    # used as keys of `row_cache`.)
+    if alg_info['c_lib']:
+        dtype = _np.dtype(_np.double)
+    else:
+        dtype = x.dtype
+
+    axis = axis % x.ndim
+
+    if row_cache is None:
+        x, shape = _as_rows(x, axis, dtype)
+    else:
+        if dtype not in row_cache:
+            row_cache[dtype] = _as_rows(x, axis, dtype)
+
+        x, shape = row_cache[dtype]
+
+    # The results are written into a single, preallocated output array.
+    n_pat = x.shape[1] - (ord - 1) * lag
 
-    if alg == "vectorised":
-        return enc_fnc(x, ord, lag, axis, True)
+    if alg == "overlap_mp_c":
+        width = _utils.pattern_uint64_width(ord)
+        pat = _np.empty((x.shape[0], n_pat, width), dtype=_np.uint64)
     else:
-        return _np.apply_along_axis(enc_fnc, axis, x, ord, lag, True)
+        pat = _np.empty((x.shape[0], n_pat), dtype=_np.uint64)
+
+    # The C library functions release the GIL, such that the time series
+    # can be processed in parallel, with each thread encoding a block of
+    # consecutive rows.
+    if alg_info['c_lib']:
+        n_threads = min(n_threads, x.shape[0], x.size // _THREAD_MIN_SAMPLES)
+    else:
+        n_threads = 1
+
+    if n_threads > 1:
+        rows = _np.linspace(0, x.shape[0], n_threads + 1).astype(int)
+
+        with _ThreadPoolExecutor(n_threads) as pool:
+            jobs = [pool.submit(_encode_rows, alg_info, x, ord, lag, pat,
+                                rows[i], rows[i + 1])
+                    for i in range(0, n_threads)]
+
+            for job in jobs:
+                job.result()
+    else:
+        _encode_rows(alg_info, x, ord, lag, pat, 0, x.shape[0])
+
+    pat = pat.reshape(shape + pat.shape[1:])
+
+    if axis != len(shape):
+        pat = _np.moveaxis(pat, len(shape), axis)
+
+    return pat
+
+
+class Encoder(object):
+    """
+    Encoder for extracting ordinal patterns repeatedly from the same data.
+
+    Checking and converting the input data, and arranging the time series
+    for the encoding functions, is done once rather than on every call of
+    `ordpat`. This pays off when patterns of several orders or time lags
+    are extracted from the same time series.
+
+    Parameters
+    ----------
+    x : array_like
+        Time series data to be encoded, see `ordpat`. The data is copied
+        only if a conversion is necessary. Thus, if `x` is an ndarray of
+        data type 'double', it must not be modified while in use.
+
+    axis : int, optional
+        The axis of the input data along which the extraction shall be
+        performed. By default, the last axis is used.
+
+    Example of usage
+    ----------------
+    >>> enc = ordpat.Encoder(np.random.randn(4, 10000))
+    >>> y = [enc.encode(ord, 2) for ord in range(3, 8)]
+
+    """
+    def __init__(self, x, axis=-1):
+        self._x         = _utils.prepare_input_data(x, 2, 1, axis,
+                                                    allow_float32=True)
+        self._axis      = 0 if axis is None else axis
+        self._row_cache = {}
+
+    def encode(self, ord, lag=1, algorithm=None, n_threads=None):
+        """
+        Return a sequence of ordinal patterns in numerical representation.
+
+        Equivalent to ``ordpat(x, ord, lag, algorithm, axis, n_threads)``,
+        with `x` and `axis` as passed to the constructor. See `ordpat` for
+        a description of the parameters and return value.
+
+        """
+        # Only the arguments are validated here, as x is known to be an
+        # ndarray in the right format already.
+        x = _utils.prepare_input_data(self._x, ord, lag, self._axis,
+                                      allow_float32=True)
+
+        return _ordpat(x, ord, lag, algorithm, self._axis, n_threads,
+                       self._row_cache)
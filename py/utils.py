@@ -41,8 +41,48 @@ ordpat module. Some may also be useful in their own right, though.
 from __future__ import division as _division
 
 import numpy as _np
-from math import factorial as _factorial, ceil as _ceil, log as _log
-from itertools import permutations as _permutations
+from math import ceil as _ceil, log as _log
+
+
+# Factorials of 0 to 255, the range of valid pattern orders. Large factorials
+# are costly to compute, so they are computed once by successive products.
+_FACT = [1]
+for _k in range(1, 256):
+    _FACT.append(_FACT[-1] * _k)
+_FACT = tuple(_FACT)
+del _k
+
+
+def _word_size(ord):
+    n_pats = _FACT[ord]
+    n_bits = _log(n_pats, 2)
+    exp    = _ceil(_log(n_bits, 2))
+
+    return int(max(8, 2**exp))
+
+
+def _uint64_width(ord):
+    n_pats  = _FACT[ord]
+    n_bits  = _log(n_pats, 2)
+    n_words = _ceil(n_bits / 64)
+
+    return int(n_words)
+
+
+# There are only few valid pattern orders, hence word sizes and widths are
+# computed once, and stored in tuples indexed by the pattern order.
+_WORD_SIZE    = (None, None) + tuple(_word_size(k) for k in range(2, 21))
+_UINT64_WIDTH = (None, None) + tuple(_uint64_width(k) for k in range(2, 256))
+
+
+def _require_double(x):
+    # Arrays that are in the right format already are returned as is, which
+    # is considerably faster than calling numpy.require.
+    if isinstance(x, _np.ndarray) and x.dtype == _np.double and \
+       x.flags.c_contiguous and x.flags.aligned:
+        return x
+
+    return _np.require(x, _np.double, "CA")
 
 
 def is_scalar_int(x):
@@ -60,6 +100,10 @@ def is_scalar_int(x):
         True if `x` is a scalar integer, False otherwise.
 
     """
+    # Fast path for the common case of Python and NumPy integers.
+    if isinstance(x, (int, _np.integer)):
+        return True
+
     return _np.ndim(x) == 0 and int(x) == x
 
 
@@ -85,26 +129,115 @@ def check_lookup_table(tab, ord):
     if not isinstance(tab, _np.ndarray):
         raise TypeError("tab must be an ndarray")
 
-    if not tab.dtype == _np.uint64:
-        raise TypeError("tab must have dtype uint64")
+    if tab.dtype not in (_np.uint16, _np.uint32, _np.uint64):
+        raise TypeError("tab must have dtype uint16, uint32 or uint64")
 
-    if not tab.flags["CA"]:
+    n_pats = _FACT[int(ord)]
+
+    if _np.iinfo(tab.dtype).max < n_pats - 1:
+        raise TypeError("tab dtype is too narrow for ord")
+
+    # Tables are only read, hence read-only arrays (e.g. memory-mapped
+    # files) are accepted. Note that flags["CA"] also implies writeability.
+    if not (tab.flags.c_contiguous and tab.flags.aligned):
         raise TypeError("tab must be contiguous and word-aligned")
 
-    if not tab.shape == (_factorial(ord), ord):
+    if not tab.shape == (n_pats, ord):
         raise ValueError("tab must have shape ord! x ord")
 
-    # Invalid codes may cause segmentation fault.
-    if (tab >= tab.shape[0]).any():
+    # Invalid codes may cause segmentation fault. (A reduction to the maximum
+    # avoids creating a temporary boolean array of the size of the table.)
+    if tab.max() >= tab.shape[0]:
         raise ValueError("tab contains invalid pattern codes")
 
 
-def prepare_input_data(x, ord, lag, axis=None):
+def check_output_array(out, shape):
+    """
+    Raise an error if `out` cannot be used to store an encoding result.
+
+    Parameters
+    ----------
+    out : possibly a duck
+        Python object to be tested.
+
+    shape : tuple of int
+        Shape of the encoding result.
+
+    """
+    if not isinstance(out, _np.ndarray):
+        raise TypeError("out must be an ndarray")
+
+    if not out.dtype == _np.uint64:
+        raise TypeError("out must have dtype uint64")
+
+    # (flags["CA"] also implies writeability.)
+    if not out.flags["CA"]:
+        raise TypeError("out must be contiguous, word-aligned and writeable")
+
+    if not out.shape == shape:
+        raise ValueError("out must have shape {}".format(shape))
+
+
+def output_array(out, shape, trustme=False):
+    """
+    Return an array to store an encoding result in.
+
+    Parameters
+    ----------
+    out : ndarray of uint64 or None
+        Array provided by the caller. If None, a new array is allocated.
+
+    shape : tuple of int
+        Shape of the encoding result.
+
+    trustme : bool, optional
+        If set to True, `out` is not validated by `check_output_array`.
+
+    Returns
+    -------
+    pat : ndarray of uint64
+        Either `out`, or a new, uninitialised array of shape `shape`.
+
+    """
+    if out is None:
+        return _np.empty(shape, dtype=_np.uint64)
+
+    if not trustme:
+        check_output_array(out, shape)
+
+    return out
+
+
+def lookup_table_dtype(ord):
+    """
+    Return the data type used for lookup tables of order `ord`.
+
+    The smallest unsigned integer type that holds all pattern codes is used,
+    as the 'lookup' algorithm is limited by memory bandwidth. Types narrower
+    than 16 bits are not used, because tables of order 5 and below fit into
+    the L1 cache anyway.
+
+    Parameters
+    ----------
+    ord : int
+        Pattern order between 2 and 10.
+
+    Returns
+    -------
+    dtype : type
+        Either numpy.uint16 (`ord` <= 8) or numpy.uint32 (otherwise).
+
+    """
+    return _np.uint16 if ord <= 8 else _np.uint32
+
+
+def prepare_input_data(x, ord, lag, axis=None, allow_float32=False):
     """
     Prepare a set of input arguments for encoding.
 
     Checks input arguments for validity/consistency. If successful,
-    converts `x` into an ndarray of data type double.
+    converts `x` into an ndarray of data type double (or float32, see
+    below).
 
     Parameters
     ----------
@@ -120,9 +253,14 @@ def prepare_input_data(x, ord, lag, axis=None):
     axis : int, optional
         Axis along which the encoding will be performed.
 
+    allow_float32 : bool, optional
+        If set to True, an ndarray `x` of data type float32 is not converted
+        to double. Ordinal patterns only depend on comparisons, which then
+        need half the memory bandwidth. The C library requires double data.
+
     Returns
     -------
-    x : ndarray of double
+    x : ndarray of double or float32
         Array containing the data in `x`, stored in row-major (C style)
         order.  If `axis` is None, then a flattened 1D array is returned,
         otherwise the shape of the input data is preserved.
@@ -143,10 +281,15 @@ def prepare_input_data(x, ord, lag, axis=None):
     if lag < 1:
         raise ValueError("time lag must be positive")
 
-    x = _np.require(x, _np.double, "CA")
+    if allow_float32 and isinstance(x, _np.ndarray) and \
+       x.dtype == _np.float32:
+        x = _np.require(x, None, "CA")
+    else:
+        x = _require_double(x)
 
     if axis is None:
-        x = x.reshape(-1)
+        if x.ndim != 1:
+            x = x.reshape(-1)
         axis = 0
 
     if x.shape[axis] <= (ord - 1) * lag:
@@ -180,11 +323,7 @@ def pattern_word_size(ord):
     if ord < 2 or ord > 20:
         raise ValueError("order must be between 2 and 20")
 
-    n_pats = _factorial(ord)
-    n_bits = _log(n_pats, 2)
-    exp    = _ceil(_log(n_bits, 2))
-
-    return int(max(8, 2**exp))
+    return _WORD_SIZE[int(ord)]
 
 
 def pattern_uint64_width(ord):
@@ -212,11 +351,7 @@ def pattern_uint64_width(ord):
     if ord < 2 or ord > 255:
         raise ValueError("order must be between 2 and 255")
 
-    n_pats  = _factorial(ord)
-    n_bits  = _log(n_pats, 2)
-    n_words = _ceil(n_bits / 64)
-
-    return int(n_words)
+    return _UINT64_WIDTH[int(ord)]
 
 
 def pattern_table(ord):
@@ -241,5 +376,20 @@ def pattern_table(ord):
     if ord < 1 or ord > 10:
         raise ValueError("order must be between 2 and 10")
 
-    tmp = range(1, ord + 1)
-    return _np.asarray([i for i in _permutations(tmp)], dtype=_np.double)
+    # The permutations of (1, ..., n) starting with f are those of
+    # (1, ..., n - 1), with all values >= f incremented by one. This keeps
+    # the lexicographic order, and builds up the table order by order.
+    tab = _np.ones((1, 1), dtype=_np.double)
+
+    for n in range(2, ord + 1):
+        m = tab.shape[0]
+        tmp = _np.empty((n * m, n), dtype=_np.double)
+
+        for f in range(1, n + 1):
+            blk = tmp[(f - 1)*m : f*m]
+            blk[:, 0] = f
+            blk[:, 1:] = tab + (tab >= f)
+
+        tab = tmp
+
+    return tab